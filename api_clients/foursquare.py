@@ -1,18 +1,40 @@
+import asyncio
 import httpx
+import orjson
+import numpy as np
+from math import radians, cos
 from typing import Optional, List, Dict
-from config import settings
+from config import CONFIG
+from shared_http import UpstreamClient
+from singleflight import SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371
 
-class FoursquareClient:
+# Category names come from a small fixed vocabulary; reuse one string
+# object per name instead of keeping a copy per attraction.
+_category_names: Dict[str, str] = {}
+
+# Bound concurrent requests to Foursquare across all callers in this process
+_foursquare_sem = asyncio.Semaphore(CONFIG.foursquare_concurrency)
+
+
+class FoursquareClient(UpstreamClient):
     """Client for Foursquare Places API."""
     
-    def __init__(self):
-        self.base_url = settings.foursquare_base_url
-        self.api_key = settings.foursquare_api_key
-        self.timeout = settings.api_timeout
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__(client)
+        self.base_url = CONFIG.foursquare_base_url
+        self.api_key = CONFIG.foursquare_api_key
+        self._inflight = SingleFlight()
+        # Static request headers, built once instead of per call
+        self._headers = {
+            "X-Places-Api-Version": "2025-06-17",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
         
     async def get_attractions(self, lat: float, lon: float, limit: int = 20) -> Optional[List[Dict]]:
         """
@@ -26,30 +48,33 @@ class FoursquareClient:
         Returns:
             List of attractions, or None if failed
         """
+        return await self._inflight.do(
+            (lat, lon, limit), lambda: self._get_attractions(lat, lon, limit)
+        )
+    
+    async def _get_attractions(self, lat: float, lon: float, limit: int) -> Optional[List[Dict]]:
+        """Fetch and process places from the upstream API."""
         if not self.api_key:
             logger.error("Foursquare API key not configured")
             return None
             
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            async with _foursquare_sem:
+                response = await self.client.get(
                     f"{self.base_url}/places/search",
                     params={
                         "ll": f"{lat},{lon}",
                         "limit": limit
                     },
-                    headers={
-                        "X-Places-Api-Version": "2025-06-17",
-                        "Accept": "application/json",
-                        "Authorization": f"Bearer {self.api_key}"
-                    },
+                    headers=self._headers,
                     timeout=self.timeout
                 )
-                response.raise_for_status()
-                data = response.json()
-                
-                attractions = self._process_places(data, lat, lon)
-                return attractions
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            attractions = self._process_places(data, lat, lon)
+            return attractions
                 
         except httpx.TimeoutException:
             logger.error(f"Timeout while fetching attractions for lat={lat}, lon={lon}")
@@ -63,24 +88,43 @@ class FoursquareClient:
     
     def _process_places(self, data: Dict, origin_lat: float, origin_lon: float) -> List[Dict]:
         """Process Foursquare Places API response into simplified attraction format."""
-        attractions = []
+        places = data.get("results", [])
+        if not places:
+            return []
         
-        for place in data.get("results", []):
-            # Get coordinates
-            geocode = place.get("geocodes", {}).get("main", {})
-            lat = geocode.get("latitude")
-            lon = geocode.get("longitude")
-            
-            # Calculate distance from origin
-            distance = None
-            if lat and lon:
-                distance = self._calculate_distance(
-                    origin_lat, origin_lon, lat, lon
-                )
+        # Get coordinates (NaN where missing)
+        geocodes = [place.get("geocodes", {}).get("main", {}) for place in places]
+        lats = np.fromiter(
+            (g.get("latitude") or np.nan for g in geocodes),
+            dtype=np.float64, count=len(places)
+        )
+        lons = np.fromiter(
+            (g.get("longitude") or np.nan for g in geocodes),
+            dtype=np.float64, count=len(places)
+        )
+        
+        # Calculate all distances from origin at once (Haversine, km);
+        # origin-side trig is computed once, outside the array math
+        o_lat_rad = radians(origin_lat)
+        o_cos = cos(o_lat_rad)
+        lat_rad = np.radians(lats)
+        dlat = lat_rad - o_lat_rad
+        dlon = np.radians(lons - origin_lon)
+        a = np.sin(dlat / 2) ** 2 + o_cos * np.cos(lat_rad) * np.sin(dlon / 2) ** 2
+        distances = np.round(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)), 2)
+        
+        # Sort by distance, places without coordinates last
+        order = np.argsort(np.where(np.isnan(distances), np.inf, distances), kind="stable")
+        
+        attractions = []
+        for i in order:
+            place = places[i]
+            distance = distances[i]
             
             # Get category
             categories = place.get("categories", [])
             category = categories[0].get("name") if categories else "Attraction"
+            category = _category_names.setdefault(category, category)
             
             # Get address
             location = place.get("location", {})
@@ -89,36 +133,8 @@ class FoursquareClient:
             attractions.append({
                 "name": place.get("name", "Unknown"),
                 "category": category,
-                "distance": distance,
-                "address": address,
-                "rating": None
+                "distance": None if np.isnan(distance) else float(distance),
+                "address": address
             })
         
-        # Sort by distance
-        attractions.sort(key=lambda x: x["distance"] if x["distance"] is not None else float('inf'))
-        
         return attractions
-    
-    @staticmethod
-    def _calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """
-        Calculate distance between two points using Haversine formula.
-        
-        Returns:
-            Distance in kilometers
-        """
-        from math import radians, sin, cos, sqrt, atan2
-        
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1_rad = radians(lat1)
-        lat2_rad = radians(lat2)
-        delta_lat = radians(lat2 - lat1)
-        delta_lon = radians(lon2 - lon1)
-        
-        a = sin(delta_lat / 2) ** 2 + cos(lat1_rad) * cos(lat2_rad) * sin(delta_lon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        
-        distance = R * c
-        return round(distance, 2)
-
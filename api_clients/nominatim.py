@@ -1,17 +1,33 @@
+import asyncio
+import time
 import httpx
+import orjson
+from cachetools import LRUCache
 from typing import Optional, Dict
-from config import settings
+from cache import cache_manager, normalize_city, upstream_city
+from config import CONFIG
+from shared_http import UpstreamClient
+from singleflight import SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Nominatim usage policy: no parallel requests, at most one per second.
+# Enforced per process; run a single worker to stay within it.
+MIN_REQUEST_INTERVAL = 1.0
+_nominatim_sem = asyncio.Semaphore(1)
 
-class NominatimClient:
+
+class NominatimClient(UpstreamClient):
     """Client for OpenStreetMap Nominatim geocoding API."""
     
-    def __init__(self):
-        self.base_url = settings.nominatim_base_url
-        self.timeout = settings.api_timeout
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__(client)
+        self.base_url = CONFIG.nominatim_base_url
+        self._inflight = SingleFlight()
+        # Process-local memo of resolved cities; coordinates never change
+        self._resolved = LRUCache(maxsize=4096)
+        self._last_request_at = 0.0
         
     async def geocode_city(self, city: str) -> Optional[Dict]:
         """
@@ -23,35 +39,63 @@ class NominatimClient:
         Returns:
             Dictionary with lat, lon, and display_name, or None if failed
         """
+        key = normalize_city(city)
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            return resolved
+        
+        # Aliases (e.g. "nyc") share a key with their canonical name, so the
+        # canonical name is what gets geocoded and stored under that key
+        result = await self._inflight.do(key, lambda: self._geocode_city(upstream_city(city)))
+        if result is not None:
+            self._resolved[key] = result
+        return result
+    
+    async def _geocode_city(self, city: str) -> Optional[Dict]:
+        """Geocode a city, consulting the geocode cache first."""
+        cached = await cache_manager.get_component("geo", city)
+        if cached:
+            logger.info(f"Geocode cache hit for city: {city}")
+            return cached
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/search",
-                    params={
-                        "q": city,
-                        "format": "json",
-                        "limit": 1,
-                        "addressdetails": 1
-                    },
-                    headers={
-                        "User-Agent": "TravelPlannerAPI/1.0"
-                    },
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                data = response.json()
+            async with _nominatim_sem:
+                # Space requests out to respect the rate limit
+                wait = self._last_request_at + MIN_REQUEST_INTERVAL - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
                 
-                if not data:
-                    logger.warning(f"No geocoding results found for city: {city}")
-                    return None
-                
-                result = data[0]
-                return {
-                    "lat": float(result["lat"]),
-                    "lon": float(result["lon"]),
-                    "display_name": result.get("display_name", ""),
-                    "country": result.get("address", {}).get("country", "")
-                }
+                try:
+                    # User-Agent is set as a default header on the shared client
+                    response = await self.client.get(
+                        f"{self.base_url}/search",
+                        params={
+                            "q": city,
+                            "format": "json",
+                            "limit": 1,
+                            "addressdetails": 1
+                        },
+                        timeout=self.timeout
+                    )
+                finally:
+                    self._last_request_at = time.monotonic()
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            if not data:
+                logger.warning(f"No geocoding results found for city: {city}")
+                return None
+            
+            result = data[0]
+            geocode = {
+                "lat": float(result["lat"]),
+                "lon": float(result["lon"]),
+                "display_name": result.get("display_name", ""),
+                "country": result.get("address", {}).get("country", "")
+            }
+            await cache_manager.set_component("geo", city, geocode, CONFIG.geocode_ttl)
+            return geocode
                 
         except httpx.TimeoutException:
             logger.error(f"Timeout while geocoding city: {city}")
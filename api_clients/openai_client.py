@@ -1,22 +1,75 @@
 """
 OpenAI Client for Natural Language Travel Planning
 """
-import json
+import functools
+import hashlib
+import httpx
 import logging
-from typing import Optional, Dict, Any
+import orjson
+from cachetools import LRUCache
+from typing import Optional, Dict, Any, AsyncIterator
 from openai import AsyncOpenAI
-from config import settings
+from cache import cache_manager, normalize_city
+from config import CONFIG
+from singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+_PARSE_SYSTEM_PROMPT = """You are a travel query parser. Extract the city name and number of days from the user's query.
+Return a JSON object with 'city' (string) and 'days' (integer, 1-5, default 3) keys.
+If the query is not about travel planning, return {"error": "Not a travel query"}.
+
+Examples:
+- "Plan a 3-day trip to Paris" -> {"city": "Paris", "days": 3}
+- "I want to visit Tokyo for 5 days" -> {"city": "Tokyo", "days": 5}
+- "Tell me about Rome" -> {"city": "Rome", "days": 3}
+- "What's the weather in London?" -> {"city": "London", "days": 3}
+- "What's the capital of France?" -> {"error": "Not a travel query"}"""
+
+_RESPONSE_SYSTEM_PROMPT = """You are a friendly and knowledgeable travel assistant. 
+Based on the travel data provided, give a helpful, conversational response to the user's query.
+Be concise but informative. Highlight key weather patterns and must-visit attractions.
+Use a warm, encouraging tone. Keep responses to 3-4 paragraphs maximum."""
+
+# Parsing runs at temperature 0 with a fixed seed so that results are
+# deterministic enough to cache per normalized query.
+PARSE_SEED = 42
+PARSE_CACHE_SIZE = 512
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _normalize_query(user_query: str) -> str:
+    """Normalize a query for use as a parse cache key."""
+    return " ".join(user_query.lower().split())
+
+
+def _narrative_hash(user_query: str, trip_data: Dict[str, Any]) -> str:
+    """
+    Short stable hash of a query and the trip data it is answered from.
+    
+    Hashing the data as well as the query means a narrative written from
+    fallback or outdated data is never reused once the data changes.
+    """
+    digest = hashlib.blake2b(user_query.strip().lower().encode(), digest_size=8)
+    digest.update(orjson.dumps(
+        [trip_data.get("country"), trip_data.get("weather", []), trip_data.get("attractions", [])]
+    ))
+    return digest.hexdigest()
+
 
 class OpenAIClient:
     """Client for OpenAI API to handle natural language travel queries."""
     
-    def __init__(self):
-        """Initialize OpenAI client."""
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        """Initialize OpenAI client, optionally on a shared HTTP client."""
+        self.client = AsyncOpenAI(
+            api_key=CONFIG.openai_api_key,
+            http_client=http_client
+        ) if CONFIG.openai_api_key else None
         self.model = "gpt-4o-mini"  # Using GPT-4o-mini for cost efficiency
+        self._parse_cache = LRUCache(maxsize=PARSE_CACHE_SIZE)
+        self._parse_inflight = SingleFlight()
+        self._narrative_inflight = SingleFlight()
         
     async def parse_travel_query(self, user_query: str) -> Optional[Dict[str, Any]]:
         """
@@ -31,32 +84,35 @@ class OpenAIClient:
         if not self.client:
             logger.error("OpenAI client not initialized. Please set OPENAI_API_KEY.")
             return None
-            
+        
+        key = _normalize_query(user_query)
+        cached = self._parse_cache.get(key)
+        if cached is not None:
+            logger.info(f"[OpenAI] Parse cache hit for query: '{user_query}'")
+            return cached
+        
+        result = await self._parse_inflight.do(key, lambda: self._parse_travel_query(user_query))
+        if result is not None:
+            self._parse_cache[key] = result
+        return result
+    
+    async def _parse_travel_query(self, user_query: str) -> Optional[Dict[str, Any]]:
+        """Parse a query with the OpenAI API."""
         try:
             logger.info(f"[OpenAI] Starting to parse query: '{user_query}'")
-            system_prompt = """You are a travel query parser. Extract the city name and number of days from the user's query.
-Return a JSON object with 'city' (string) and 'days' (integer, 1-5, default 3) keys.
-If the query is not about travel planning, return {"error": "Not a travel query"}.
-
-Examples:
-- "Plan a 3-day trip to Paris" -> {"city": "Paris", "days": 3}
-- "I want to visit Tokyo for 5 days" -> {"city": "Tokyo", "days": 5}
-- "Tell me about Rome" -> {"city": "Rome", "days": 3}
-- "What's the weather in London?" -> {"city": "London", "days": 3}
-- "What's the capital of France?" -> {"error": "Not a travel query"}"""
-
             logger.info("[OpenAI] Sending request to OpenAI API for query parsing...")
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": _PARSE_SYSTEM_PROMPT},
                     {"role": "user", "content": user_query}
                 ],
-                temperature=0.1,
+                temperature=0.0,
+                seed=PARSE_SEED,
                 response_format={"type": "json_object"}
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             logger.info(f"[OpenAI] Successfully parsed query: {user_query} -> {result}")
             return result
             
@@ -74,7 +130,7 @@ Examples:
         
         Args:
             user_query: Original user query
-            trip_data: Structured trip data from the API
+            trip_data: Compact trip summary (city, country, days, weather, attractions)
             
         Returns:
             Natural language response as a string
@@ -82,57 +138,99 @@ Examples:
         if not self.client:
             logger.error("[OpenAI] OpenAI client not initialized. Please set OPENAI_API_KEY.")
             return "I'm unable to process your request. Please check the OpenAI API configuration."
-            
+        
+        # Repeat questions about the same trip reuse the generated narrative
+        city = trip_data.get("city", "")
+        days = trip_data.get("days", 0)
+        content_hash = _narrative_hash(user_query, trip_data)
+        cached = await cache_manager.narrative_get(city, days, content_hash)
+        if cached:
+            logger.info(f"[OpenAI] Narrative cache hit for query: '{user_query}'")
+            return cached
+        
+        return await self._narrative_inflight.do(
+            (normalize_city(city), days, content_hash),
+            lambda: self._generate_travel_response(user_query, trip_data, content_hash)
+        )
+    
+    async def _generate_travel_response(
+        self, 
+        user_query: str, 
+        trip_data: Dict[str, Any],
+        content_hash: str
+    ) -> str:
+        """Generate a response with the OpenAI API and cache it on success."""
         try:
-            logger.info(f"[OpenAI] Generating natural language response for query: '{user_query}'")
-            # Format trip data for the LLM
-            city = trip_data.get("city", "Unknown")
-            country = trip_data.get("country", "")
-            days = trip_data.get("days", 0)
-            weather = trip_data.get("weather_forecast", [])
-            attractions = trip_data.get("top_attractions", [])
+            chunks = [chunk async for chunk in self.stream_travel_response(user_query, trip_data)]
             
-            logger.info(f"[OpenAI] Trip data summary - City: {city}, Days: {days}, Weather items: {len(weather)}, Attractions: {len(attractions)}")
-            
-            # Create a concise data summary
-            data_summary = f"""
-City: {city}, {country}
-Days: {days}
-
-Weather Forecast:
-"""
-            for day in weather[:3]:  # Limit to first 3 days
-                data_summary += f"- {day.get('date', 'N/A')}: {day.get('temp_avg', 'N/A')}°C, {day.get('description', 'N/A')}\n"
-            
-            data_summary += "\nTop Attractions:\n"
-            for i, attr in enumerate(attractions[:5], 1):  # Limit to top 5
-                data_summary += f"{i}. {attr.get('name', 'N/A')}"
-                if attr.get('distance'):
-                    data_summary += f" ({attr.get('distance')}km away)"
-                data_summary += "\n"
-            
-            system_prompt = """You are a friendly and knowledgeable travel assistant. 
-Based on the travel data provided, give a helpful, conversational response to the user's query.
-Be concise but informative. Highlight key weather patterns and must-visit attractions.
-Use a warm, encouraging tone. Keep responses to 3-4 paragraphs maximum."""
-
-            logger.info("[OpenAI] Sending request to OpenAI API for response generation...")
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"User Query: {user_query}\n\nTravel Data:\n{data_summary}"}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            generated_response = response.choices[0].message.content.strip()
+            generated_response = "".join(chunks).strip()
             logger.info(f"[OpenAI] Successfully generated response (length: {len(generated_response)} chars)")
             logger.debug(f"[OpenAI] Response preview: {generated_response[:200]}...")
+            await cache_manager.narrative_set(
+                trip_data.get("city", ""), trip_data.get("days", 0), content_hash, generated_response
+            )
             return generated_response
             
         except Exception as e:
             logger.error(f"[OpenAI] Error generating travel response: {e}", exc_info=True)
             return f"I found information about {trip_data.get('city', 'your destination')}, but I'm having trouble formatting a response. Please try again."
+    
+    async def stream_travel_response(
+        self, 
+        user_query: str, 
+        trip_data: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """
+        Stream a natural language response about the trip as it is generated.
+        
+        Args:
+            user_query: Original user query
+            trip_data: Compact trip summary (city, country, days, weather, attractions)
+            
+        Yields:
+            Text chunks of the response, in order
+        """
+        if not self.client:
+            logger.error("[OpenAI] OpenAI client not initialized. Please set OPENAI_API_KEY.")
+            yield "I'm unable to process your request. Please check the OpenAI API configuration."
+            return
+        
+        logger.info(f"[OpenAI] Generating natural language response for query: '{user_query}'")
+        # Format trip data for the LLM
+        city = trip_data.get("city", "Unknown")
+        country = trip_data.get("country", "")
+        days = trip_data.get("days", 0)
+        weather = trip_data.get("weather", [])
+        attractions = trip_data.get("attractions", [])
+        
+        logger.info(f"[OpenAI] Trip data summary - City: {city}, Days: {days}, Weather items: {len(weather)}, Attractions: {len(attractions)}")
+        
+        # Create a concise data summary
+        data_summary = f"""
+City: {city}, {country}
+Days: {days}
 
+Weather Forecast:
+"""
+        for date, temp_min, temp_max, description in weather[:3]:  # Limit to first 3 days
+            data_summary += f"- {date}: {temp_min}-{temp_max}°C, {description}\n"
+        
+        data_summary += "\nTop Attractions:\n"
+        for i, name in enumerate(attractions[:5], 1):  # Limit to top 5
+            data_summary += f"{i}. {name}\n"
+        
+        logger.info("[OpenAI] Sending streaming request to OpenAI API for response generation...")
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": _RESPONSE_SYSTEM_PROMPT},
+                {"role": "user", "content": f"User Query: {user_query}\n\nTravel Data:\n{data_summary}"}
+            ],
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+        
+        async for chunk in stream:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
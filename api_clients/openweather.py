@@ -1,19 +1,31 @@
+import asyncio
 import httpx
+import orjson
 from typing import Optional, List, Dict
-from datetime import datetime, timedelta
-from config import settings
+from datetime import datetime, timezone
+from config import CONFIG
+from shared_http import UpstreamClient
+from singleflight import SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Weather descriptions repeat across days and cities; reuse one string
+# object per description instead of keeping a copy per day.
+_descriptions: Dict[str, str] = {}
 
-class OpenWeatherClient:
+# Bound concurrent requests to OpenWeatherMap across all callers in this process
+_openweather_sem = asyncio.Semaphore(CONFIG.openweather_concurrency)
+
+
+class OpenWeatherClient(UpstreamClient):
     """Client for OpenWeatherMap API."""
     
-    def __init__(self):
-        self.base_url = settings.openweather_base_url
-        self.api_key = settings.openweather_api_key
-        self.timeout = settings.api_timeout
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        super().__init__(client)
+        self.base_url = CONFIG.openweather_base_url
+        self.api_key = CONFIG.openweather_api_key
+        self._inflight = SingleFlight()
         
     async def get_forecast(self, lat: float, lon: float, days: int) -> Optional[List[Dict]]:
         """
@@ -27,29 +39,37 @@ class OpenWeatherClient:
         Returns:
             List of daily weather data, or None if failed
         """
+        return await self._inflight.do(
+            (lat, lon, days), lambda: self._get_forecast(lat, lon, days)
+        )
+    
+    async def _get_forecast(self, lat: float, lon: float, days: int) -> Optional[List[Dict]]:
+        """Fetch and process the forecast from the upstream API."""
         if not self.api_key:
             logger.error("OpenWeatherMap API key not configured")
             return None
             
         try:
-            async with httpx.AsyncClient() as client:
-                # Use 5-day forecast API
-                response = await client.get(
-                    f"{self.base_url}/forecast",
+            # Use One Call API: one pre-aggregated row per day
+            async with _openweather_sem:
+                response = await self.client.get(
+                    f"{self.base_url}/onecall",
                     params={
                         "lat": lat,
                         "lon": lon,
+                        "exclude": "current,minutely,hourly,alerts",
                         "appid": self.api_key,
                         "units": "metric"
                     },
                     timeout=self.timeout
                 )
-                response.raise_for_status()
-                data = response.json()
-                
-                # Process forecast data into daily summaries
-                daily_forecasts = self._process_forecast(data, days)
-                return daily_forecasts
+            
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            # Map daily forecast rows into our summary format
+            daily_forecasts = self._process_forecast(data, days)
+            return daily_forecasts
                 
         except httpx.TimeoutException:
             logger.error(f"Timeout while fetching weather for lat={lat}, lon={lon}")
@@ -62,45 +82,21 @@ class OpenWeatherClient:
             return None
     
     def _process_forecast(self, data: Dict, days: int) -> List[Dict]:
-        """Process raw forecast data into daily summaries."""
-        daily_data = {}
-        
-        for item in data.get("list", []):
-            dt = datetime.fromtimestamp(item["dt"])
-            date_key = dt.strftime("%Y-%m-%d")
-            
-            if date_key not in daily_data:
-                daily_data[date_key] = {
-                    "date": date_key,
-                    "temps": [],
-                    "descriptions": [],
-                    "humidity": [],
-                    "wind_speed": []
-                }
-            
-            daily_data[date_key]["temps"].append(item["main"]["temp"])
-            daily_data[date_key]["descriptions"].append(
-                item["weather"][0]["description"]
-            )
-            daily_data[date_key]["humidity"].append(item["main"]["humidity"])
-            daily_data[date_key]["wind_speed"].append(item["wind"]["speed"])
-        
-        # Aggregate daily data
+        """Process One Call daily forecast rows into daily summaries."""
         result = []
-        for date_key in sorted(daily_data.keys())[:days]:
-            day = daily_data[date_key]
-            temps = day["temps"]
-            
+        # dt is midday local time; shift by the city's UTC offset so cities far
+        # east of UTC (e.g. Auckland at UTC+13) don't get the previous date
+        offset = data.get("timezone_offset", 0)
+        for day in data.get("daily", [])[:days]:
+            description = day["weather"][0]["description"]
             result.append({
-                "date": day["date"],
-                "temp_avg": round(sum(temps) / len(temps), 1),
-                "temp_min": round(min(temps), 1),
-                "temp_max": round(max(temps), 1),
-                "description": max(set(day["descriptions"]), 
-                                 key=day["descriptions"].count),
-                "humidity": int(sum(day["humidity"]) / len(day["humidity"])),
-                "wind_speed": round(sum(day["wind_speed"]) / len(day["wind_speed"]), 1)
+                "date": datetime.fromtimestamp(day["dt"] + offset, tz=timezone.utc).strftime("%Y-%m-%d"),
+                "temp_avg": round(day["temp"]["day"], 1),
+                "temp_min": round(day["temp"]["min"], 1),
+                "temp_max": round(day["temp"]["max"], 1),
+                "description": _descriptions.setdefault(description, description),
+                "humidity": int(day["humidity"]),
+                "wind_speed": round(day["wind_speed"], 1)
             })
         
         return result
-
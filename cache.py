@@ -1,28 +1,116 @@
 import redis
-import json
-from typing import Optional, Any
-from config import settings
+import redis.asyncio as aioredis
+import msgspec
+import struct
+import threading
+import time
+import unicodedata
+from cachetools import TTLCache
+from typing import Optional, Any, List, Tuple
+from config import CONFIG
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Trip blobs are stored as the ready-to-serve JSON response bytes behind an
+# 8-byte insertion timestamp; the prefix is versioned so entries written in
+# an older format are never returned by this version.
+KEY_PREFIX = "trip4"
+_STAMP = struct.Struct(">d")
+
+# Generated trip narratives are reused for a day
+NARRATIVE_TTL = 24 * 3600  # 24 hours
+
+_encoder = msgspec.msgpack.Encoder()
+_decoder = msgspec.msgpack.Decoder()
+
+
+def normalize_city(city: str) -> str:
+    """
+    Normalize a city name for use in cache and in-flight keys.
+    
+    Applies NFKC, casefolding and whitespace collapsing, then maps known
+    aliases (e.g. "nyc") to their canonical name so they share entries.
+    
+    Args:
+        city: City name as given by the user
+        
+    Returns:
+        Normalized city name
+    """
+    folded = _fold_city(city)
+    return CONFIG.city_aliases.get(folded, folded)
+
+
+def upstream_city(city: str) -> str:
+    """
+    Name to send to upstream APIs for a city.
+    
+    Args:
+        city: City name as given by the user
+        
+    Returns:
+        The canonical name if the city is a known alias, else the city as given
+    """
+    return CONFIG.city_aliases.get(_fold_city(city), city)
+
+
+def _fold_city(city: str) -> str:
+    """NFKC-normalize, casefold and collapse whitespace in a city name."""
+    return " ".join(unicodedata.normalize("NFKC", city).casefold().split())
+
+
+def _stamp(data: bytes) -> bytes:
+    """Prefix trip JSON bytes with the current time."""
+    return _STAMP.pack(time.time()) + data
+
+
+def _unstamp(blob: bytes) -> Tuple[bytes, float]:
+    """Split a stored trip blob into its JSON bytes and its age in seconds."""
+    (inserted_at,) = _STAMP.unpack_from(blob)
+    return blob[_STAMP.size:], max(0.0, time.time() - inserted_at)
+
+
+def is_stale(age: float) -> bool:
+    """Whether a cached trip plan of this age is due for a background refresh."""
+    return age > CONFIG.cache_ttl
+
 
 class CacheManager:
-    """Redis cache manager for API responses."""
+    """Two-tier cache manager: in-process TTL LRU in front of Redis."""
     
     def __init__(self):
-        """Initialize Redis connection."""
-        try:
-            self.redis_client = redis.Redis(
-                host=settings.redis_host,
-                port=settings.redis_port,
-                db=settings.redis_db,
-                password=settings.redis_password if settings.redis_password else None,
-                decode_responses=True,
+        """Initialize the in-process cache and Redis connection."""
+        # First-level cache so hot cities skip the Redis round-trip
+        self._local = TTLCache(maxsize=1024, ttl=CONFIG.cache_ttl)
+        self._local_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        # Pooled asyncio client so cache calls never block the event loop;
+        # the connection is verified by connect() at application startup.
+        self.redis_client = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool(
+                host=CONFIG.redis_host,
+                port=CONFIG.redis_port,
+                db=CONFIG.redis_db,
+                password=CONFIG.redis_password if CONFIG.redis_password else None,
+                max_connections=32,
+                decode_responses=False,
                 socket_connect_timeout=5
             )
-            # Test connection
-            self.redis_client.ping()
+        )
+        self.enabled = False
+    
+    async def connect(self) -> bool:
+        """
+        Test the Redis connection and enable caching if it is reachable.
+        
+        Returns:
+            True if Redis is available, False otherwise
+        """
+        try:
+            await self.redis_client.ping()
             logger.info("Redis connection established")
             self.enabled = True
         except (redis.ConnectionError, redis.TimeoutError) as e:
@@ -31,50 +119,93 @@ class CacheManager:
         except Exception as e:
             logger.warning(f"Unexpected error connecting to Redis: {e}. Caching disabled.")
             self.enabled = False
+        return self.enabled
+    
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self.redis_client.aclose()
     
     def _generate_key(self, city: str, days: int) -> str:
         """Generate cache key for city and days."""
-        # Normalize city name (lowercase, strip whitespace)
-        normalized_city = city.lower().strip()
-        return f"trip:{normalized_city}:{days}"
+        return f"{KEY_PREFIX}:{normalize_city(city)}:{days}"
+    
+    def _local_get(self, key: str) -> Optional[bytes]:
+        """Look up a key in the in-process cache, tracking hits and misses."""
+        with self._local_lock:
+            data = self._local.get(key)
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return data
+    
+    def _local_set(self, key: str, data: bytes) -> None:
+        """Store a value in the in-process cache."""
+        with self._local_lock:
+            self._local[key] = data
+    
+    async def get(self, city: str, days: int) -> Optional[bytes]:
+        """
+        Get cached trip data, fresh or stale.
+        
+        Args:
+            city: City name
+            days: Number of days
+            
+        Returns:
+            Cached JSON bytes or None if not found
+        """
+        data, _ = await self.get_entry(city, days)
+        return data
     
-    def get(self, city: str, days: int) -> Optional[dict]:
+    async def get_entry(self, city: str, days: int) -> Tuple[Optional[bytes], float]:
         """
-        Get cached trip data.
+        Get cached trip data along with its age.
+        
+        Entries are served for up to cache_stale_ttl seconds but count as
+        stale (see is_stale) once they are older than cache_ttl, so callers
+        can return them immediately and refresh in the background.
         
         Args:
             city: City name
             days: Number of days
             
         Returns:
-            Cached data dictionary or None if not found
+            Tuple of (cached JSON bytes or None if not found, age in seconds)
         """
         if not self.enabled:
-            return None
+            return None, 0.0
         
         try:
             key = self._generate_key(city, days)
-            cached_data = self.redis_client.get(key)
+            blob = self._local_get(key)
+            # Lookups run on every request: log lazily at debug level
+            if blob is not None:
+                logger.debug("Local cache hit for key: %s", key)
+                return _unstamp(blob)
             
-            if cached_data:
-                logger.info(f"Cache hit for key: {key}")
-                return json.loads(cached_data)
+            blob = await self.redis_client.get(key)
             
-            logger.info(f"Cache miss for key: {key}")
-            return None
+            if blob:
+                logger.debug("Cache hit for key: %s", key)
+                self._local_set(key, blob)
+                return _unstamp(blob)
+            
+            logger.debug("Cache miss for key: %s", key)
+            return None, 0.0
             
         except Exception as e:
             logger.error(f"Error retrieving from cache: {e}")
-            return None
+            return None, 0.0
     
-    def set(self, city: str, days: int, data: dict) -> bool:
+    async def set(self, city: str, days: int, data: bytes) -> bool:
         """
         Set trip data in cache.
         
         Args:
             city: City name
             days: Number of days
-            data: Data to cache
+            data: Serialized JSON bytes to cache
             
         Returns:
             True if successful, False otherwise
@@ -84,22 +215,60 @@ class CacheManager:
         
         try:
             key = self._generate_key(city, days)
-            serialized_data = json.dumps(data)
+            blob = _stamp(data)
             
-            self.redis_client.setex(
+            # Kept until the hard TTL so stale entries can still be served
+            await self.redis_client.setex(
                 key,
-                settings.cache_ttl,
-                serialized_data
+                CONFIG.cache_stale_ttl,
+                blob
             )
+            self._local_set(key, blob)
             
-            logger.info(f"Cached data for key: {key} (TTL: {settings.cache_ttl}s)")
+            logger.info(f"Cached data for key: {key} (TTL: {CONFIG.cache_ttl}s, stale TTL: {CONFIG.cache_stale_ttl}s)")
             return True
             
         except Exception as e:
             logger.error(f"Error setting cache: {e}")
             return False
     
-    def delete(self, city: str, days: int) -> bool:
+    async def get_many(self, items: List[Tuple[str, int]]) -> List[Tuple[Optional[bytes], float]]:
+        """
+        Get cached trip data for several (city, days) pairs in one round-trip.
+        
+        Args:
+            items: List of (city, days) pairs
+            
+        Returns:
+            List of (cached JSON bytes or None if not found, age in seconds)
+            tuples, in input order
+        """
+        if not self.enabled or not items:
+            return [(None, 0.0)] * len(items)
+        
+        try:
+            keys = [self._generate_key(city, days) for city, days in items]
+            blobs = [self._local_get(key) for key in keys]
+            
+            # Only go to Redis for keys the in-process cache doesn't have
+            missing = [i for i, blob in enumerate(blobs) if blob is None]
+            if missing:
+                cached_values = await self.redis_client.mget([keys[i] for i in missing])
+                for i, value in zip(missing, cached_values):
+                    if value:
+                        blobs[i] = value
+                        self._local_set(keys[i], value)
+            
+            results = [_unstamp(blob) if blob else (None, 0.0) for blob in blobs]
+            hits = sum(1 for data, _ in results if data is not None)
+            logger.debug("Cache batch lookup: %d/%d hits", hits, len(keys))
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error retrieving batch from cache: {e}")
+            return [(None, 0.0)] * len(items)
+    
+    async def delete(self, city: str, days: int) -> bool:
         """
         Delete cached trip data.
         
@@ -115,7 +284,9 @@ class CacheManager:
         
         try:
             key = self._generate_key(city, days)
-            self.redis_client.delete(key)
+            with self._local_lock:
+                self._local.pop(key, None)
+            await self.redis_client.delete(key)
             logger.info(f"Deleted cache for key: {key}")
             return True
             
@@ -123,16 +294,138 @@ class CacheManager:
             logger.error(f"Error deleting from cache: {e}")
             return False
     
-    def clear_all(self) -> bool:
+    @staticmethod
+    def _component_key(kind: str, key: str) -> str:
+        """Generate cache key for a trip component (e.g. geo, weather, attractions)."""
+        return f"{kind}:{normalize_city(key)}"
+    
+    async def get_component(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Get a cached trip component.
+        
+        Args:
+            kind: Component kind, used as the key namespace
+            key: Component key within that namespace (e.g. city name)
+            
+        Returns:
+            Cached component value or None if not found
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            cached_data = await self.redis_client.get(self._component_key(kind, key))
+            return _decoder.decode(cached_data) if cached_data else None
+            
+        except Exception as e:
+            logger.error(f"Error retrieving {kind} component from cache: {e}")
+            return None
+    
+    async def set_component(self, kind: str, key: str, value: Any, ttl: int) -> bool:
+        """
+        Cache a trip component with its own TTL.
+        
+        Args:
+            kind: Component kind, used as the key namespace
+            key: Component key within that namespace (e.g. city name)
+            value: Component value to cache
+            ttl: Time-to-live in seconds
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.enabled:
+            return False
+        
+        try:
+            await self.redis_client.setex(
+                self._component_key(kind, key),
+                ttl,
+                _encoder.encode(value)
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error caching {kind} component: {e}")
+            return False
+    
+    @staticmethod
+    def _narrative_key(city: str, days: int, content_hash: str) -> str:
+        """Generate cache key for a generated trip narrative."""
+        return f"narr:{normalize_city(city)}:{days}:{content_hash}"
+    
+    async def narrative_get(self, city: str, days: int, content_hash: str) -> Optional[str]:
+        """
+        Get a cached trip narrative.
+        
+        Args:
+            city: City name
+            days: Number of days
+            content_hash: Hash of the normalized user query and its trip data
+            
+        Returns:
+            Cached narrative text or None if not found
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            cached_data = await self.redis_client.get(self._narrative_key(city, days, content_hash))
+            return _decoder.decode(cached_data) if cached_data else None
+            
+        except Exception as e:
+            logger.error(f"Error retrieving narrative from cache: {e}")
+            return None
+    
+    async def narrative_set(self, city: str, days: int, content_hash: str, text: str) -> bool:
+        """
+        Cache a generated trip narrative.
+        
+        Args:
+            city: City name
+            days: Number of days
+            content_hash: Hash of the normalized user query and its trip data
+            text: Narrative text to cache
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.enabled:
+            return False
+        
+        try:
+            await self.redis_client.setex(
+                self._narrative_key(city, days, content_hash),
+                NARRATIVE_TTL,
+                _encoder.encode(text)
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error caching narrative: {e}")
+            return False
+    
+    async def clear_all(self) -> bool:
         """Clear all cached trip data."""
         if not self.enabled:
             return False
         
         try:
-            keys = self.redis_client.keys("trip:*")
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Cleared {len(keys)} cached entries")
+            with self._local_lock:
+                self._local.clear()
+            
+            # SCAN + UNLINK avoids blocking Redis on large keyspaces
+            cleared = 0
+            pipe = self.redis_client.pipeline(transaction=False)
+            async for key in self.redis_client.scan_iter(match=f"{KEY_PREFIX}:*", count=500):
+                pipe.unlink(key)
+                cleared += 1
+                if cleared % 500 == 0:
+                    await pipe.execute()
+            await pipe.execute()
+            
+            if cleared:
+                logger.info(f"Cleared {cleared} cached entries")
             return True
             
         except Exception as e:
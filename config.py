@@ -1,5 +1,6 @@
+from dataclasses import make_dataclass
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -16,14 +17,47 @@ class Settings(BaseSettings):
     redis_db: int = 0
     redis_password: Optional[str] = None
     
-    # Cache TTL (in seconds)
+    # Cache TTL (in seconds); trip plans older than cache_ttl are served stale
+    # and refreshed in the background until cache_stale_ttl
     cache_ttl: int = 3600  # 1 hour
+    cache_stale_ttl: int = 24 * 3600  # 24 hours
+    
+    # Per-component cache TTLs (in seconds); data that changes slowly is kept longer
+    geocode_ttl: int = 30 * 24 * 3600  # 30 days
+    attractions_ttl: int = 24 * 3600  # 24 hours
+    weather_ttl: int = 3600  # 1 hour
+    
+    # Max concurrent requests per provider, shared by all requests in one worker
+    # process; Nominatim is one at a time per process (see workers below)
+    openweather_concurrency: int = 20
+    foursquare_concurrency: int = 20
+    
+    # Normalized city aliases mapped to the canonical name that is geocoded and shares their cache entries
+    city_aliases: Dict[str, str] = {
+        "nyc": "new york",
+        "la": "los angeles",
+        "sf": "san francisco",
+        "rio": "rio de janeiro"
+    }
     
     # API Timeouts (in seconds)
     api_timeout: int = 10
+    # Per-provider budget on the /trip fan-out; a slower provider falls back
+    upstream_timeout: float = 2.5
+    
+    # Fraction of requests whose info-level logs are kept (all or nothing per
+    # request); warnings and errors are always logged
+    log_sample_rate: float = 0.1
+    
+    # Server: production runs uvloop + httptools
+    production: bool = False
+    # Worker processes in production. Rate limits, concurrency caps and request
+    # coalescing are per process, so N workers send N times the upstream load
+    # (including N parallel Nominatim requests, against its usage policy)
+    workers: int = 1
     
     # API URLs
-    openweather_base_url: str = "https://api.openweathermap.org/data/2.5"
+    openweather_base_url: str = "https://api.openweathermap.org/data/3.0"
     nominatim_base_url: str = "https://nominatim.openstreetmap.org"
     foursquare_base_url: str = "https://places-api.foursquare.com"
     
@@ -34,3 +68,13 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+# Plain frozen copy of the validated settings for hot paths; attribute
+# reads on a slotted dataclass skip Pydantic's model machinery.
+_FrozenConfig = make_dataclass(
+    "_FrozenConfig",
+    [(name, field.annotation) for name, field in Settings.model_fields.items()],
+    frozen=True,
+    slots=True
+)
+
+CONFIG = _FrozenConfig(**settings.model_dump())
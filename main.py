@@ -1,37 +1,91 @@
 import asyncio
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse, FileResponse
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+import numpy as np
+import orjson
+import random
+import structlog
+import xxhash
+from cachetools import LRUCache
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import logging
 from pathlib import Path
 
 from models import (
     TripResponse, WeatherDay, Attraction, TravelNotes, 
-    DistanceCluster, Coordinates, ChatRequest, ChatResponse
+    DistanceCluster, Coordinates, ChatRequest, ChatResponse,
+    WEATHER_ADAPTER, ATTRACTIONS_ADAPTER, TRIP_ADAPTER
 )
 from api_clients.nominatim import NominatimClient
 from api_clients.openweather import OpenWeatherClient
 from api_clients.foursquare import FoursquareClient
 from api_clients.openai_client import OpenAIClient
-from cache import cache_manager
-from config import settings
+from cache import cache_manager, is_stale, normalize_city
+from config import CONFIG
+from shared_http import get_client, close_client
+from singleflight import SingleFlight
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
+
+
+# Whether the current request's info events are logged; decided once per
+# request so a sampled request keeps its whole trace
+_log_sampled: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
+
+def _sample_info(logger, method_name, event_dict):
+    """Keep every warning and error but only the info events of sampled requests."""
+    if method_name == "info" and not _log_sampled.get():
+        raise structlog.DropEvent
+    return event_dict
+
+
+class LogSamplingMiddleware:
+    """ASGI middleware that decides once per request whether to keep its info logs."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            _log_sampled.set(random.random() < CONFIG.log_sample_rate)
+        await self.app(scope, receive, send)
+
+
+# Request-path events are structured JSON rendered by orjson; event fields
+# are only serialized for events that survive level filtering and sampling
+structlog.configure(
+    processors=[
+        _sample_info,
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.format_exc_info,
+        structlog.processors.JSONRenderer(serializer=orjson.dumps)
+    ],
+    wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
+    logger_factory=structlog.BytesLoggerFactory(),
+    cache_logger_on_first_use=True
+)
+log = structlog.get_logger()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Multi-Source Travel Planner API",
     description="Aggregate travel information from multiple sources with AI-powered natural language interface",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
+app.add_middleware(LogSamplingMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -41,11 +95,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize API clients
-nominatim_client = NominatimClient()
-weather_client = OpenWeatherClient()
-foursquare_client = FoursquareClient()
-openai_client = OpenAIClient()
+
+@app.on_event("startup")
+async def startup():
+    """Create the shared HTTP client and API clients, start the CPU pool and connect to Redis."""
+    app.state.http = get_client()
+    app.state.nominatim_client = NominatimClient(client=app.state.http)
+    app.state.weather_client = OpenWeatherClient(client=app.state.http)
+    app.state.foursquare_client = FoursquareClient(client=app.state.http)
+    app.state.openai_client = OpenAIClient(http_client=app.state.http)
+    # Background cache refreshes build and serialize plans here, never request handlers
+    app.state.cpu_pool = ProcessPoolExecutor(max_workers=2)
+    await cache_manager.connect()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled upstream and Redis connections and stop the CPU pool."""
+    await close_client()
+    await cache_manager.close()
+    app.state.cpu_pool.shutdown(wait=False, cancel_futures=True)
 
 # Setup static files directory
 static_dir = Path(__file__).parent / "static"
@@ -71,6 +140,7 @@ async def health_check():
 
 @app.get("/trip", response_model=TripResponse, tags=["Travel"])
 async def get_trip_plan(
+    request: Request,
     city: str = Query(..., description="City name (e.g., Rome, Paris, Tokyo)"),
     days: int = Query(3, ge=1, le=5, description="Number of days (1-5)")
 ):
@@ -88,105 +158,380 @@ async def get_trip_plan(
     - Timeout and fallback handling
     - City-level caching with Redis
     """
-    logger.info(f"[TRIP] Trip request received: city={city}, days={days}")
+    log.info("trip.request", city=city, days=days)
     
     # Check cache first
-    logger.info(f"[TRIP] Checking cache for {city}...")
-    cached_data = cache_manager.get(city, days)
-    if cached_data:
-        logger.info(f"[TRIP] Cache HIT - Returning cached data for {city}")
-        cached_data["cached"] = True
-        return TripResponse(**cached_data)
+    cached_trip, age = await cache_manager.get_entry(city, days)
+    if cached_trip:
+        stale = is_stale(age)
+        if stale:
+            _schedule_refresh(city, days)
+        # Cached bytes are this endpoint's own JSON output: serve them as-is
+        # instead of validating and re-serializing through TripResponse
+        log.info("trip.cache_hit", city=city, days=days, stale=stale)
+        payload = _with_city(cached_trip, city)
+        return _trip_json_response(
+            request, payload, payload.replace(b'"cached":false', b'"cached":true', 1), age
+        )
+    
+    log.info("trip.cache_miss", city=city, days=days)
+    trip_response = await _fetch_trip_plan(city, days)
+    if trip_response is None:
+        raise HTTPException(status_code=404, detail=_city_not_found(city))
+    # Skip FastAPI's response_model validation and jsonable_encoder pass
+    payload = TRIP_ADAPTER.dump_json(trip_response)
+    if trip_response._degraded:
+        # Built from fallback data and not cached server-side: don't let
+        # browsers or CDNs keep it either
+        return Response(
+            content=payload, media_type="application/json",
+            headers={"Cache-Control": "no-store"}
+        )
+    return _trip_json_response(request, payload, payload, 0.0)
+
+
+def _cache_control(age: float) -> str:
+    """
+    Cache-Control for a trip plan that has been cached for age seconds.
+    
+    Clients may reuse a plan for as long as the server would still call it
+    fresh, then serve it stale while revalidating until the server drops it.
+    Plans that are already stale are being refreshed, so clients revalidate.
+    """
+    if is_stale(age):
+        return "public, max-age=0"
+    return (
+        f"public, max-age={int(CONFIG.cache_ttl - age)}, "
+        f"stale-while-revalidate={CONFIG.cache_stale_ttl - CONFIG.cache_ttl}"
+    )
+
+
+def _trip_json_response(request: Request, payload: bytes, body: bytes, age: float) -> Response:
+    """
+    Wrap a trip plan in a response that browsers and CDNs can cache and revalidate.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        payload: Plan JSON as stored in the cache, used for the ETag
+        body: JSON bytes to send (payload with the cached flag set, on hits)
+        age: Seconds the plan has been cached (0 for a fresh build)
+        
+    Returns:
+        JSON response, or an empty 304 if the client's copy is current
+    """
+    # Weak ETag: hits and misses differ only in the "cached" flag
+    headers = {
+        "Cache-Control": _cache_control(age),
+        "ETag": f'W/"{xxhash.xxh3_64_hexdigest(payload)}"'
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or headers["ETag"] in if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _with_city(payload: bytes, city: str) -> bytes:
+    """
+    Rewrite the city field of stored plan JSON to the caller's spelling.
+    
+    Plans are shared by every spelling that normalizes to the same key.
+    city is TripResponse's first field and country always follows it; a
+    literal ,"country": can't occur inside the JSON-escaped city string.
+    """
+    return b'{"city":' + orjson.dumps(city) + payload[payload.index(b',"country":'):]
+
+
+def _city_not_found(city: str) -> str:
+    """Error detail for a city that could not be geocoded."""
+    return f"City '{city}' not found. Please check the spelling and try again."
+
+
+async def _load_trip_plan(city: str, days: int) -> Optional[TripResponse]:
+    """Get a trip plan as a model, from cache if possible; None if the city is unknown."""
+    cached_trip, age = await cache_manager.get_entry(city, days)
+    return await _plan_from_entry(city, days, cached_trip, age)
+
+
+async def _plan_from_entry(
+    city: str,
+    days: int,
+    cached_trip: Optional[bytes],
+    age: float
+) -> Optional[TripResponse]:
+    """Turn a cache lookup result into a trip plan, building it on a miss."""
+    if cached_trip:
+        stale = is_stale(age)
+        if stale:
+            _schedule_refresh(city, days)
+        log.info("trip.cache_hit", city=city, days=days, stale=stale)
+        trip_response = TripResponse.model_validate_json(cached_trip)
+        trip_response.city = city
+        trip_response.cached = True
+        return trip_response
+    
+    log.info("trip.cache_miss", city=city, days=days)
+    return await _fetch_trip_plan(city, days)
+
+
+# Concurrent misses for the same (city, days) share one upstream build
+_trip_inflight = SingleFlight()
+
+
+async def _fetch_trip_plan(city: str, days: int) -> Optional[TripResponse]:
+    """Build a trip plan, joining a build already in flight for the same city and days."""
+    trip_response = await _trip_inflight.do(
+        (normalize_city(city), days),
+        lambda: _build_trip_plan(city, days)
+    )
+    if trip_response is not None and trip_response.city != city:
+        # The build may have been started by a differently spelled request
+        trip_response = trip_response.model_copy(update={"city": city})
+    return trip_response
+
+
+# Background refreshes of stale cache entries, one per (city, days)
+_refreshing: Dict[Tuple[str, int], asyncio.Task] = {}
+
+
+def _schedule_refresh(city: str, days: int) -> None:
+    """Refresh a stale cached trip plan in the background, unless already running."""
+    key = (normalize_city(city), days)
+    if key in _refreshing:
+        return
+    
+    log.info("trip.refresh_scheduled", city=city, days=days)
+    task = asyncio.create_task(_refresh(city, days))
+    _refreshing[key] = task
+    task.add_done_callback(lambda _: _refreshing.pop(key, None))
+
+
+async def _refresh(city: str, days: int) -> None:
+    """Rebuild a trip plan, overwriting its cache entry."""
+    try:
+        upstream = await _fetch_upstream(city, days)
+        if upstream is None:
+            return
+        country, lat, lon, weather_data, attractions_data = upstream
+        # Provider exceptions may not pickle; the fallbacks only need to know it failed
+        if isinstance(weather_data, Exception):
+            log.error("trip.weather_failed", city=city, error_type=type(weather_data).__name__, error=str(weather_data))
+            weather_data = None
+        if isinstance(attractions_data, Exception):
+            log.error("trip.attractions_failed", city=city, error_type=type(attractions_data).__name__, error=str(attractions_data))
+            attractions_data = None
+        
+        # Validation and serialization run in the CPU pool, off the event loop
+        cache_payload, degraded = await asyncio.get_running_loop().run_in_executor(
+            app.state.cpu_pool, _build_and_dump,
+            city, days, country, lat, lon, weather_data, attractions_data
+        )
+        # Keep serving the stale plan rather than replacing it with placeholders
+        if degraded:
+            log.warning("trip.refresh_degraded", city=city, days=days)
+            return
+        await cache_manager.set(city, days, cache_payload)
+        log.info("trip.refreshed", city=city, days=days)
+    except Exception as e:
+        log.error("trip.refresh_failed", city=city, days=days, error_type=type(e).__name__, error=str(e))
+
+
+async def _build_trip_plan(city: str, days: int) -> Optional[TripResponse]:
+    """Fetch fresh data from the upstream APIs and cache the resulting plan; None if the city is unknown."""
+    upstream = await _fetch_upstream(city, days)
+    if upstream is None:
+        return None
+    trip_response = _assemble_trip_plan(city, days, *upstream)
+    
+    # Plans with placeholder data aren't cached: the provider calls keep
+    # running past their budget and fill the component cache, so the next
+    # request can build the complete plan
+    if trip_response._degraded:
+        log.warning("trip.not_cached_degraded", city=city, days=days)
+        return trip_response
+    
+    # Cache the response (serialized once)
+    cache_payload = TRIP_ADAPTER.dump_json(trip_response)
+    cache_success = await cache_manager.set(city, days, cache_payload)
+    log.info("trip.cached", city=city, days=days, success=cache_success)
     
-    logger.info(f"[TRIP] Cache MISS - Fetching fresh data for {city}")
+    return trip_response
+
+
+async def _fetch_upstream(city: str, days: int) -> Optional[tuple]:
+    """
+    Geocode the city and fetch its weather and attractions.
     
+    Args:
+        city: City name
+        days: Number of days
+        
+    Returns:
+        Tuple of (country, lat, lon, weather data, attractions data), or
+        None if the city could not be geocoded; the data entries may be
+        exceptions from a failed or slow provider
+    """
     # Step 1: Geocode the city (this must complete first)
-    logger.info(f"[TRIP] Step 1: Geocoding city '{city}'...")
-    geocode_result = await nominatim_client.geocode_city(city)
+    log.info("trip.step", step=1, name="geocode", city=city)
+    geocode_result = await app.state.nominatim_client.geocode_city(city)
     if not geocode_result:
-        logger.error(f"[TRIP] Geocoding failed - city '{city}' not found")
-        raise HTTPException(
-            status_code=404,
-            detail=f"City '{city}' not found. Please check the spelling and try again."
-        )
+        log.error("trip.city_not_found", city=city)
+        return None
     
     lat = geocode_result["lat"]
     lon = geocode_result["lon"]
     country = geocode_result.get("country", "")
     
-    logger.info(f"[TRIP] Geocoded {city}: lat={lat}, lon={lon}, country={country}")
+    log.info("trip.geocoded", city=city, lat=lat, lon=lon, country=country)
     
     # Step 2: Fetch weather and attractions in parallel
-    logger.info(f"[TRIP] Step 2: Fetching weather and attractions in parallel...")
-    weather_task = weather_client.get_forecast(lat, lon, days)
-    attractions_task = foursquare_client.get_attractions(lat, lon, limit=20)
+    log.info("trip.step", step=2, name="fetch", city=city)
+    # Each component is cached separately with a TTL matching how fast it goes stale
+    weather_task = asyncio.create_task(_cached_component(
+        "weather", f"{normalize_city(city)}:{days}", CONFIG.weather_ttl,
+        lambda: app.state.weather_client.get_forecast(lat, lon, days)
+    ))
+    attractions_task = asyncio.create_task(_cached_component(
+        "attractions", city, CONFIG.attractions_ttl,
+        lambda: app.state.foursquare_client.get_attractions(lat, lon, limit=20)
+    ))
     
-    # Wait for both API calls to complete
+    # Wait for both API calls to complete; a failure in one must not cancel the other,
+    # and each gets its own time budget so a slow provider falls back on its own.
+    # Shielded so a call that overruns its budget still finishes and fills the
+    # component cache for the next request.
     weather_data, attractions_data = await asyncio.gather(
-        weather_task,
-        attractions_task,
+        _bounded(asyncio.shield(weather_task), CONFIG.upstream_timeout),
+        _bounded(asyncio.shield(attractions_task), CONFIG.upstream_timeout),
         return_exceptions=True
     )
-    logger.info(f"[TRIP] Parallel API calls completed")
     
+    return country, lat, lon, weather_data, attractions_data
+
+
+def _assemble_trip_plan(
+    city: str,
+    days: int,
+    country: str,
+    lat: float,
+    lon: float,
+    weather_data,
+    attractions_data
+) -> TripResponse:
+    """Build the trip plan from upstream results, applying fallbacks (CPU only, no I/O)."""
     # Step 3: Handle results with fallbacks
-    logger.info(f"[TRIP] Step 3: Processing API results...")
+    log.info("trip.step", step=3, name="process", city=city)
     weather_forecast = []
+    weather_ok = False
     if isinstance(weather_data, Exception):
-        logger.error(f"[TRIP] Weather API failed: {weather_data}")
+        log.error("trip.weather_failed", city=city, error_type=type(weather_data).__name__, error=str(weather_data))
         weather_forecast = _get_fallback_weather(days)
     elif weather_data:
-        weather_forecast = [WeatherDay(**day) for day in weather_data]
-        logger.info(f"[TRIP] Weather data processed: {len(weather_forecast)} days")
+        weather_forecast = WEATHER_ADAPTER.validate_python(weather_data)
+        weather_ok = True
+        log.info("trip.weather", city=city, days=len(weather_forecast))
     else:
-        logger.warning(f"[TRIP] No weather data returned, using fallback")
+        log.warning("trip.weather_empty", city=city)
         weather_forecast = _get_fallback_weather(days)
     
     top_attractions = []
+    attractions_ok = False
     if isinstance(attractions_data, Exception):
-        logger.error(f"[TRIP] Attractions API failed: {attractions_data}")
+        log.error("trip.attractions_failed", city=city, error_type=type(attractions_data).__name__, error=str(attractions_data))
         top_attractions = _get_fallback_attractions()
     elif attractions_data:
-        top_attractions = [Attraction(**attr) for attr in attractions_data[:10]]
-        logger.info(f"[TRIP] Attractions data processed: {len(top_attractions)} attractions")
+        top_attractions = ATTRACTIONS_ADAPTER.validate_python(attractions_data[:10])
+        attractions_ok = True
+        log.info("trip.attractions", city=city, count=len(top_attractions))
     else:
-        logger.warning(f"[TRIP] No attractions data returned, using fallback")
+        log.warning("trip.attractions_empty", city=city)
         top_attractions = _get_fallback_attractions()
     
     # Step 4: Generate travel notes with distance clustering
-    logger.info(f"[TRIP] Step 4: Generating travel notes...")
+    log.info("trip.step", step=4, name="notes", city=city)
     travel_notes = _generate_travel_notes(attractions_data if attractions_data and not isinstance(attractions_data, Exception) else [])
     
-    # Step 5: Build response
-    logger.info(f"[TRIP] Step 5: Building response...")
-    response_data = {
-        "city": city,
-        "country": country,
-        "coordinates": Coordinates(lat=lat, lon=lon).model_dump(),
-        "days": days,
-        "weather_forecast": [w.model_dump() for w in weather_forecast],
-        "top_attractions": [a.model_dump() for a in top_attractions],
-        "travel_notes": travel_notes.model_dump(),
-        "cached": False
-    }
-    
-    # Cache the response
-    logger.info(f"[TRIP] Caching response data for {city}...")
-    cache_success = cache_manager.set(city, days, response_data)
-    logger.info(f"[TRIP] Cache save {'successful' if cache_success else 'failed'}")
+    # Step 5: Build response from the already-validated models
+    log.info("trip.step", step=5, name="build", city=city)
+    trip_response = TripResponse(
+        city=city,
+        country=country,
+        coordinates=Coordinates.model_construct(lat=lat, lon=lon),
+        days=days,
+        weather_forecast=weather_forecast,
+        top_attractions=top_attractions,
+        travel_notes=travel_notes,
+        cached=False
+    )
+    trip_response._degraded = not (weather_ok and attractions_ok)
     
-    logger.info(f"[TRIP] Successfully generated trip plan for {city}")
-    trip_response = TripResponse(**response_data)
-    logger.info(f"[TRIP] Response object created successfully")
     return trip_response
 
 
-def _get_fallback_weather(days: int) -> list[WeatherDay]:
-    """Provide fallback weather data when API fails."""
-    logger.warning("Using fallback weather data")
-    fallback = []
-    for i in range(days):
-        fallback.append(WeatherDay(
+def _build_and_dump(city: str, days: int, *upstream) -> Tuple[bytes, bool]:
+    """Assemble a trip plan and serialize it to JSON bytes; runs in the CPU pool."""
+    trip_response = _assemble_trip_plan(city, days, *upstream)
+    return TRIP_ADAPTER.dump_json(trip_response), trip_response._degraded
+
+
+async def _cached_component(kind: str, key: str, ttl: int, fetch):
+    """Return a cached trip component, fetching and caching it on a miss."""
+    cached = await cache_manager.get_component(kind, key)
+    if cached is not None:
+        log.info("trip.component_cache_hit", kind=kind, key=key)
+        return cached
+    
+    value = await fetch()
+    if value:
+        await cache_manager.set_component(kind, key, value, ttl)
+    return value
+
+
+async def _bounded(awaitable, timeout: float):
+    """Await an upstream call, raising TimeoutError if it exceeds its budget."""
+    return await asyncio.wait_for(awaitable, timeout=timeout)
+
+
+# New cities geocode one per second (Nominatim policy), so cap /trips fan-out
+MAX_TRIP_CITIES = 10
+
+
+@app.get("/trips", response_model=List[TripResponse], tags=["Travel"])
+async def get_multi_city_plan(
+    cities: List[str] = Query(
+        ...,
+        max_length=MAX_TRIP_CITIES,
+        description=f"City names, repeated (e.g., cities=Rome&cities=Paris), at most {MAX_TRIP_CITIES}"
+    ),
+    days: int = Query(3, ge=1, le=5, description="Number of days (1-5)")
+):
+    """
+    Get travel plans for several cities at once.
+    
+    Cities are planned concurrently; per-provider semaphores in the API
+    clients keep the upstream request rate bounded.
+    """
+    return await plan_many(cities, days)
+
+
+async def plan_many(cities: List[str], days: int) -> List[TripResponse]:
+    """Plan trips for several cities concurrently."""
+    log.info("trips.request", cities=cities, days=days)
+    # One batched cache lookup for every city, then build only the misses
+    entries = await cache_manager.get_many([(city, days) for city in cities])
+    plans = await asyncio.gather(*(
+        _plan_from_entry(city, days, cached_trip, age)
+        for city, (cached_trip, age) in zip(cities, entries)
+    ))
+    for city, plan in zip(cities, plans):
+        if plan is None:
+            raise HTTPException(status_code=404, detail=_city_not_found(city))
+    return plans
+
+
+def _build_fallback_weather(days: int) -> tuple:
+    """Build placeholder weather for the given number of days."""
+    return tuple(
+        WeatherDay(
             date=f"Day {i+1}",
             temp_avg=20.0,
             temp_min=15.0,
@@ -194,22 +539,56 @@ def _get_fallback_weather(days: int) -> list[WeatherDay]:
             description="Weather data unavailable",
             humidity=50,
             wind_speed=5.0
-        ))
-    return fallback
+        )
+        for i in range(days)
+    )
+
+
+# Fallback data is identical on every failure, so build it once for the
+# 1-5 days the endpoints allow
+_FALLBACK_WEATHER = {days: _build_fallback_weather(days) for days in range(1, 6)}
+
+_FALLBACK_ATTRACTIONS = (
+    Attraction(
+        name="Attractions data unavailable",
+        category="Information",
+        distance=None,
+        address="Please check API configuration",
+        rating=None
+    ),
+)
+
+
+def _get_fallback_weather(days: int) -> list[WeatherDay]:
+    """Provide fallback weather data when API fails."""
+    log.warning("trip.fallback", component="weather")
+    fallback = _FALLBACK_WEATHER.get(days)
+    if fallback is None:
+        fallback = _build_fallback_weather(days)
+    return list(fallback)
 
 
 def _get_fallback_attractions() -> list[Attraction]:
     """Provide fallback attraction data when API fails."""
-    logger.warning("Using fallback attractions data")
-    return [
-        Attraction(
-            name="Attractions data unavailable",
-            category="Information",
-            distance=None,
-            address="Please check API configuration",
-            rating=None
-        )
-    ]
+    log.warning("trip.fallback", component="attractions")
+    return list(_FALLBACK_ATTRACTIONS)
+
+
+# Distance cluster upper bounds (in km) and their labels
+DISTANCE_THRESHOLDS = np.array([2.0, 5.0, 10.0, np.inf])
+DISTANCE_CLUSTER_NAMES = (
+    "Within 2km (Walking distance)",
+    "Within 5km (Short trip)",
+    "Within 10km (Moderate trip)",
+    "Beyond 10km"
+)
+
+# Below this many attractions NumPy's call overhead outweighs the plain loop
+VECTORIZE_MIN_ATTRACTIONS = 32
+
+# Travel notes keyed by a content hash of the attractions they were built from;
+# Foursquare returns identical lists for a city minute-to-minute
+_travel_notes_cache = LRUCache(maxsize=1024)
 
 
 def _generate_travel_notes(attractions: list) -> TravelNotes:
@@ -222,46 +601,72 @@ def _generate_travel_notes(attractions: list) -> TravelNotes:
     Returns:
         TravelNotes object with distance clusters
     """
+    # Notes are built from already-normalized data, so skip re-validation
+    # with model_construct; TripResponse serializes the tree once at the end
     if not attractions:
-        return TravelNotes(
+        return TravelNotes.model_construct(
             distance_clusters=[],
             total_attractions=0
         )
     
-    # Define distance thresholds (in km)
-    thresholds = [
-        (2, "Within 2km (Walking distance)"),
-        (5, "Within 5km (Short trip)"),
-        (10, "Within 10km (Moderate trip)"),
-        (float('inf'), "Beyond 10km")
-    ]
-    
-    clusters = {name: [] for _, name in thresholds}
+    notes_key = xxhash.xxh3_64_intdigest(orjson.dumps(attractions))
+    cached_notes = _travel_notes_cache.get(notes_key)
+    if cached_notes is not None:
+        return cached_notes
     
-    for attraction in attractions:
-        distance = attraction.get("distance")
-        if distance is None:
-            continue
-        
-        for threshold, cluster_name in thresholds:
-            if distance <= threshold:
-                clusters[cluster_name].append(attraction["name"])
-                break
+    if len(attractions) < VECTORIZE_MIN_ATTRACTIONS:
+        clusters = _bucket_attractions_loop(attractions)
+    else:
+        clusters = _bucket_attractions_numpy(attractions)
     
     distance_clusters = []
-    for _, cluster_name in thresholds:
+    for cluster_name in DISTANCE_CLUSTER_NAMES:
         cluster_attractions = clusters[cluster_name]
         if cluster_attractions:
-            distance_clusters.append(DistanceCluster(
+            distance_clusters.append(DistanceCluster.model_construct(
                 cluster_name=cluster_name,
                 count=len(cluster_attractions),
                 attractions=cluster_attractions[:5]  # Limit to 5 per cluster
             ))
     
-    return TravelNotes(
+    travel_notes = TravelNotes.model_construct(
         distance_clusters=distance_clusters,
         total_attractions=len(attractions)
     )
+    _travel_notes_cache[notes_key] = travel_notes
+    return travel_notes
+
+
+def _bucket_attractions_loop(attractions: list) -> dict:
+    """Group attraction names by distance cluster with a plain Python loop."""
+    clusters = {name: [] for name in DISTANCE_CLUSTER_NAMES}
+    
+    for attraction in attractions:
+        distance = attraction.get("distance")
+        if distance is None:
+            continue
+        
+        for threshold, cluster_name in zip(DISTANCE_THRESHOLDS, DISTANCE_CLUSTER_NAMES):
+            if distance <= threshold:
+                clusters[cluster_name].append(attraction["name"])
+                break
+    
+    return clusters
+
+
+def _bucket_attractions_numpy(attractions: list) -> dict:
+    """Group attraction names by distance cluster using np.searchsorted."""
+    located = [a for a in attractions if a.get("distance") is not None]
+    distances = np.fromiter((a["distance"] for a in located), dtype=np.float64, count=len(located))
+    
+    # side="left" puts a distance equal to a threshold in that threshold's bucket (<=)
+    buckets = np.searchsorted(DISTANCE_THRESHOLDS, distances, side="left")
+    
+    clusters = {name: [] for name in DISTANCE_CLUSTER_NAMES}
+    for attraction, bucket in zip(located, buckets.tolist()):
+        clusters[DISTANCE_CLUSTER_NAMES[bucket]].append(attraction["name"])
+    
+    return clusters
 
 
 @app.exception_handler(HTTPException)
@@ -291,66 +696,18 @@ async def chat_with_ai(request: ChatRequest):
     - "What's the weather like in Tokyo?"
     - "Tell me about attractions in Rome"
     """
-    logger.info(f"[CHAT] ===== NEW CHAT REQUEST =====")
-    logger.info(f"[CHAT] User query: '{request.query}'")
+    log.info("chat.request", query=request.query)
     
     try:
-        # Parse the user query to extract parameters
-        logger.info("[CHAT] Step 1: Parsing user query with OpenAI...")
-        parsed = await openai_client.parse_travel_query(request.query)
-        logger.info(f"[CHAT] Parse result: {parsed}")
-        
-        if not parsed:
-            logger.warning("[CHAT] Failed to parse query - returning error response")
-            return ChatResponse(
-                query=request.query,
-                response="I'm having trouble understanding your request. Could you please rephrase it?",
-                error="Failed to parse query"
-            )
-        
-        # Check if it's an error (not a travel query)
-        if "error" in parsed:
-            logger.info(f"[CHAT] Query not recognized as travel query: {parsed['error']}")
-            return ChatResponse(
-                query=request.query,
-                response="I'm a travel planning assistant. Please ask me about destinations, weather, or attractions in cities around the world!",
-                error=parsed["error"]
-            )
-        
-        # Extract city and days
-        city = parsed.get("city")
-        days = parsed.get("days", 3)
-        logger.info(f"[CHAT] Extracted parameters - City: {city}, Days: {days}")
-        
-        if not city:
-            logger.warning("[CHAT] No city found in parsed query")
-            return ChatResponse(
-                query=request.query,
-                response="I couldn't identify a city in your query. Which city would you like to know about?",
-                error="No city specified"
-            )
-        
-        # Fetch trip data (reusing existing endpoint logic)
-        logger.info(f"[CHAT] Step 2: Fetching trip data for {city}...")
-        try:
-            trip_data = await get_trip_plan(city=city, days=days)
-            trip_dict = trip_data.model_dump()
-            logger.info(f"[CHAT] Successfully fetched trip data for {city}")
-        except HTTPException as e:
-            logger.error(f"[CHAT] Failed to fetch trip data: {e.detail}")
-            return ChatResponse(
-                query=request.query,
-                response=f"I couldn't find information about {city}. Please check the city name and try again.",
-                error=e.detail
-            )
+        trip_data, error_response = await _load_chat_trip(request.query)
+        if error_response is not None:
+            return error_response
         
         # Generate natural language response
-        logger.info("[CHAT] Step 3: Generating natural language response with OpenAI...")
-        nl_response = await openai_client.generate_travel_response(
+        nl_response = await app.state.openai_client.generate_travel_response(
             user_query=request.query,
-            trip_data=trip_dict
+            trip_data=_compact_for_llm(trip_data)
         )
-        logger.info(f"[CHAT] Generated response length: {len(nl_response)} characters")
         
         chat_response = ChatResponse(
             query=request.query,
@@ -358,18 +715,141 @@ async def chat_with_ai(request: ChatRequest):
             trip_data=trip_data
         )
         
-        logger.info("[CHAT] ===== CHAT REQUEST COMPLETED SUCCESSFULLY =====")
-        logger.info(f"[CHAT] Response preview: {nl_response[:150]}...")
+        log.info("chat.completed", city=trip_data.city, days=trip_data.days, response_chars=len(nl_response))
         return chat_response
         
     except Exception as e:
-        logger.error(f"[CHAT] ===== CHAT REQUEST FAILED =====")
-        logger.error(f"[CHAT] Unexpected error in chat endpoint: {e}", exc_info=True)
-        return ChatResponse(
-            query=request.query,
-            response="I encountered an error processing your request. Please try again.",
-            error=str(e)
+        log.error("chat.failed", error=str(e), exc_info=True)
+        return _chat_failed(request.query, e)
+
+
+@app.post("/chat/stream", tags=["AI Chat"])
+async def chat_with_ai_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat over Server-Sent Events.
+    
+    Events:
+    - `trip`: the structured trip plan, sent before any text
+    - (default): `{"delta": "..."}` chunks of the response as they are generated
+    - `error`: a ChatResponse explaining why the query couldn't be answered
+    - `done`: end of stream
+    """
+    log.info("chat.stream_request", query=request.query)
+    return StreamingResponse(_chat_events(request.query), media_type="text/event-stream")
+
+
+async def _chat_events(query: str) -> AsyncIterator[bytes]:
+    """Produce the SSE events for a streamed chat response."""
+    try:
+        trip_data, error_response = await _load_chat_trip(query)
+        if error_response is not None:
+            yield _sse(error_response.model_dump_json().encode(), event="error")
+        else:
+            yield _sse(TRIP_ADAPTER.dump_json(trip_data), event="trip")
+            async for chunk in app.state.openai_client.stream_travel_response(
+                query, _compact_for_llm(trip_data)
+            ):
+                if chunk:
+                    yield _sse(orjson.dumps({"delta": chunk}))
+            log.info("chat.stream_completed", city=trip_data.city, days=trip_data.days)
+    except Exception as e:
+        log.error("chat.failed", error=str(e), exc_info=True)
+        yield _sse(_chat_failed(query, e).model_dump_json().encode(), event="error")
+    yield _sse(b"{}", event="done")
+
+
+def _sse(data: bytes, event: Optional[str] = None) -> bytes:
+    """Format one Server-Sent Event; data must be a single line (e.g. compact JSON)."""
+    prefix = f"event: {event}\n".encode() if event else b""
+    return prefix + b"data: " + data + b"\n\n"
+
+
+def _chat_failed(query: str, error: Exception) -> ChatResponse:
+    """Generic chat response for an unexpected error."""
+    return ChatResponse(
+        query=query,
+        response="I encountered an error processing your request. Please try again.",
+        error=str(error)
+    )
+
+
+async def _load_chat_trip(query: str) -> Tuple[Optional[TripResponse], Optional[ChatResponse]]:
+    """
+    Parse a chat query and load the trip plan it asks about.
+    
+    Args:
+        query: Natural language travel query
+        
+    Returns:
+        (trip plan, None) on success, or (None, ChatResponse explaining why not)
+    """
+    # Parse the user query to extract parameters
+    parsed = await app.state.openai_client.parse_travel_query(query)
+    log.info("chat.parsed", parsed=parsed)
+    
+    if not parsed:
+        log.warning("chat.parse_failed", query=query)
+        return None, ChatResponse(
+            query=query,
+            response="I'm having trouble understanding your request. Could you please rephrase it?",
+            error="Failed to parse query"
+        )
+    
+    # Check if it's an error (not a travel query)
+    if "error" in parsed:
+        log.info("chat.not_travel", error=parsed["error"])
+        return None, ChatResponse(
+            query=query,
+            response="I'm a travel planning assistant. Please ask me about destinations, weather, or attractions in cities around the world!",
+            error=parsed["error"]
         )
+    
+    # Extract city and days; days comes from the LLM, so hold it to the
+    # 1-5 range /trip's Query validator enforces
+    city = parsed.get("city")
+    days = min(max(int(parsed.get("days") or 3), 1), 5)
+    
+    if not city:
+        log.warning("chat.no_city", query=query)
+        return None, ChatResponse(
+            query=query,
+            response="I couldn't identify a city in your query. Which city would you like to know about?",
+            error="No city specified"
+        )
+    
+    # Fetch trip data (reusing existing endpoint logic)
+    trip_data = await _load_trip_plan(city, days)
+    if trip_data is None:
+        log.error("chat.trip_failed", city=city, days=days)
+        return None, ChatResponse(
+            query=query,
+            response=f"I couldn't find information about {city}. Please check the city name and try again.",
+            error=_city_not_found(city)
+        )
+    log.info("chat.trip_loaded", city=city, days=days)
+    return trip_data, None
+
+
+def _compact_for_llm(tr: TripResponse) -> dict:
+    """
+    Project a trip plan down to what the LLM prompt actually uses.
+    
+    Args:
+        tr: Full trip plan
+        
+    Returns:
+        Small dict with headline weather tuples and top attraction names
+    """
+    return {
+        "city": tr.city,
+        "country": tr.country,
+        "days": tr.days,
+        "weather": [
+            (w.date, w.temp_min, w.temp_max, w.description)
+            for w in tr.weather_forecast[:3]
+        ],
+        "attractions": [a.name for a in tr.top_attractions[:5]]
+    }
 
 
 # Mount static files for the UI (assets like JS, CSS, images)
@@ -394,7 +874,7 @@ async def serve_ui():
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """Handle unexpected exceptions."""
-    logger.error(f"Unexpected error: {exc}", exc_info=True)
+    log.error("unhandled_error", error=str(exc), exc_info=True)
     return JSONResponse(
         status_code=500,
         content={
@@ -406,5 +886,16 @@ async def general_exception_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if CONFIG.production:
+        # Workers need the app as an import string
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=8000,
+            loop="uvloop",
+            http="httptools",
+            workers=CONFIG.workers
+        )
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 
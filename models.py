@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter
 from typing import List, Optional
 
 
@@ -10,6 +10,8 @@ class Coordinates(BaseModel):
 
 class WeatherDay(BaseModel):
     """Weather information for a single day."""
+    model_config = ConfigDict(frozen=True)
+    
     date: str
     temp_avg: float = Field(description="Average temperature in Celsius")
     temp_min: float = Field(description="Minimum temperature in Celsius")
@@ -21,6 +23,8 @@ class WeatherDay(BaseModel):
 
 class Attraction(BaseModel):
     """Point of interest / attraction."""
+    model_config = ConfigDict(frozen=True)
+    
     name: str
     category: str
     distance: Optional[float] = Field(None, description="Distance from city center in km")
@@ -30,6 +34,8 @@ class Attraction(BaseModel):
 
 class DistanceCluster(BaseModel):
     """Group of attractions by distance."""
+    model_config = ConfigDict(frozen=True)
+    
     cluster_name: str = Field(description="e.g., 'Within 2km', 'Within 5km'")
     count: int
     attractions: List[str]
@@ -51,6 +57,17 @@ class TripResponse(BaseModel):
     top_attractions: List[Attraction]
     travel_notes: TravelNotes
     cached: bool = Field(default=False, description="Whether response was served from cache")
+    
+    # Set when weather or attractions fell back to placeholder data; not serialized
+    _degraded: bool = PrivateAttr(default=False)
+
+
+# Validate whole upstream lists in one pydantic-core call instead of per item
+WEATHER_ADAPTER = TypeAdapter(List[WeatherDay])
+ATTRACTIONS_ADAPTER = TypeAdapter(List[Attraction])
+
+# Serializes a TripResponse straight to JSON bytes in pydantic-core
+TRIP_ADAPTER = TypeAdapter(TripResponse)
 
 
 class ChatRequest(BaseModel):
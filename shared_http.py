@@ -0,0 +1,74 @@
+import httpx
+from typing import Optional
+from config import CONFIG
+import logging
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 lets concurrent requests to one provider (e.g. a /trips fan-out)
+# share a single TLS connection as multiplexed streams. It needs the h2
+# package (httpx[http2]); without it, fall back to pooled HTTP/1.1.
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Single pooled client shared by every upstream API client so that
+# connections (and their TLS sessions) are reused across requests.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(CONFIG.api_timeout, connect=3.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=100,
+                max_connections=200,
+                keepalive_expiry=60
+            ),
+            headers={
+                "User-Agent": "TravelPlannerAPI/1.0",
+                "Accept-Encoding": "gzip, br"
+            }
+        )
+        logger.info(f"Shared HTTP client created (HTTP/2: {HTTP2_AVAILABLE})")
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client and release its connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed")
+
+
+class UpstreamClient:
+    """
+    Base for upstream API clients: an HTTP client closed only by its owner.
+    
+    A client passed in (normally the shared pool from get_client) belongs
+    to the application; without one, the instance creates and owns its own.
+    """
+    
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.timeout = CONFIG.api_timeout
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=self.timeout)
+    
+    async def close(self):
+        """Close the underlying HTTP client if this instance created it."""
+        if self._owns_client:
+            await self.client.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
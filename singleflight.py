@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    The first caller for a key starts the work; anyone else asking for the
+    same key while it is still running awaits the same result instead of
+    starting a duplicate call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() for key, or join the call already in flight for it.
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._forget(key, future))
+
+        # Shield so one cancelled caller doesn't cancel the call for everyone
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
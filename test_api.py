@@ -135,6 +135,107 @@ def test_api():
     except Exception as e:
         print(f"   ❌ Error: {e}")
     
+    # Test 6: Multi-city endpoint
+    print("\n6. Testing multi-city endpoint (Rome + Paris, 2 days)...")
+    try:
+        response = httpx.get(
+            f"{base_url}/trips",
+            params=[("cities", "Rome"), ("cities", "Paris"), ("days", 2)],
+            timeout=30.0
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            print(f"   ✅ Multi-city works: {[plan['city'] for plan in data]}")
+        else:
+            print(f"   ❌ Multi-city failed: {response.status_code}")
+            print(f"   Response: {response.text}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+    
+    # Test 7: Multi-city limit
+    print("\n7. Testing multi-city limit (11 cities)...")
+    try:
+        response = httpx.get(
+            f"{base_url}/trips",
+            params=[("cities", f"City{i}") for i in range(11)],
+            timeout=30.0
+        )
+        
+        if response.status_code == 422:
+            print(f"   ✅ Too many cities rejected (422)")
+        else:
+            print(f"   ⚠️  Unexpected status: {response.status_code}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+    
+    # Test 8: HTTP caching headers and conditional requests
+    print("\n8. Testing Cache-Control / ETag (Paris, 3 days)...")
+    try:
+        response = httpx.get(
+            f"{base_url}/trip",
+            params={"city": "Paris", "days": 3},
+            timeout=30.0
+        )
+        cache_control = response.headers.get("cache-control")
+        etag = response.headers.get("etag")
+        print(f"   Cache-Control: {cache_control}")
+        print(f"   ETag: {etag}")
+        
+        if response.status_code != 200 or not cache_control:
+            print(f"   ❌ Missing Cache-Control (status {response.status_code})")
+        elif cache_control == "no-store":
+            print(f"   ⚠️  Plan built from fallback data, not cacheable (check API keys)")
+        elif not etag:
+            print(f"   ❌ Missing ETag")
+        else:
+            response = httpx.get(
+                f"{base_url}/trip",
+                params={"city": "Paris", "days": 3},
+                headers={"If-None-Match": etag},
+                timeout=30.0
+            )
+            if response.status_code == 304 and not response.content:
+                print(f"   ✅ Conditional request returned 304 Not Modified")
+            else:
+                print(f"   ❌ Expected 304 for matching ETag, got {response.status_code}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+    
+    # Test 9: Streamed chat over Server-Sent Events
+    print("\n9. Testing streamed chat (Plan a 2-day trip to Paris)...")
+    try:
+        events = []
+        with httpx.stream(
+            "POST",
+            f"{base_url}/chat/stream",
+            json={"query": "Plan a 2-day trip to Paris"},
+            timeout=60.0
+        ) as response:
+            event = "message"
+            for line in response.iter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    events.append((event, json.loads(line[len("data: "):])))
+                    event = "message"
+        
+        names = [name for name, _ in events]
+        deltas = [data for name, data in events if name == "message" and "delta" in data]
+        print(f"   Events: trip={names.count('trip')}, deltas={len(deltas)}, error={names.count('error')}")
+        
+        if response.status_code != 200 or not names or names[-1] != "done":
+            print(f"   ❌ Stream did not end with a done event (status {response.status_code})")
+        elif names[0] == "trip" and deltas:
+            print(f"   ✅ Stream sent the trip, {len(deltas)} text chunks and done")
+        elif "error" in names:
+            error = dict(events)["error"]
+            print(f"   ⚠️  Stream reported an error (is OPENAI_API_KEY set?): {error.get('error')}")
+        else:
+            print(f"   ❌ Unexpected events: {names}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+    
     print("\n" + "=" * 60)
     print("✨ Testing complete!\n")
     return True